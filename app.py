@@ -3,20 +3,31 @@ Production FastAPI Application
 Voice AI Service with WebSocket and REST API
 """
 import asyncio
-from datetime import datetime, timezone
+import time
 from contextlib import asynccontextmanager
+from pathlib import Path
 
+import aiofiles.tempfile
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
+try:
+    # libuv-based event loop for every startup path (uvicorn, ASGI test harnesses)
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 from config.settings import settings
 from core.pipeline import AIPipeline
 from core.connection_manager import manager
 from models.schemas import *
 from utils.logger import setup_logger
 from utils.exceptions import AIServiceException
+from utils.clock import current_iso_ts, run_clock
+from utils import cache
 from routers import broadcast_tts, inbound_calls
 from services.inbound_service import inbound_service
 
@@ -25,6 +36,9 @@ logger = setup_logger(__name__)
 # Initialize pipeline
 pipeline = None
 
+# Upload spooling for /process-audio
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
@@ -34,6 +48,9 @@ async def lifespan(app: FastAPI):
     logger.info(f"🚀 Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     logger.info(f"Environment: {'Development' if settings.DEBUG else 'Production'}")
     
+    clock_task = asyncio.create_task(run_clock())
+    status_task = asyncio.create_task(inbound_calls.run_status_ticker())
+    
     try:
         pipeline = AIPipeline()
         logger.info("✓ AI Pipeline initialized")
@@ -42,6 +59,9 @@ async def lifespan(app: FastAPI):
         await inbound_service.initialize()
         logger.info("✓ Inbound Service initialized")
         
+        # Voice catalog may have changed since the last deploy
+        await cache.invalidate("voices")
+        
     except Exception as e:
         logger.error(f"✗ Failed to initialize services: {str(e)}")
         raise
@@ -50,15 +70,19 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down...")
+    clock_task.cancel()
+    status_task.cancel()
     await inbound_service.cleanup()
     await manager.close_all()
+    await cache.close()
     logger.info("✓ Shutdown complete")
 
 # Initialize FastAPI
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -73,7 +97,7 @@ app.add_middleware(
 # Error handler
 @app.exception_handler(AIServiceException)
 async def ai_exception_handler(request, exc: AIServiceException):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -83,17 +107,17 @@ async def ai_exception_handler(request, exc: AIServiceException):
     )
 
 # Health check
-@app.get("/", response_model=HealthResponse)
+@app.get("/")
 async def root():
-    """Health check endpoint"""
-    health = pipeline.health_check()
+    """Health check endpoint (returned directly, no response-model validation)"""
+    health = await pipeline.health_check()
     
-    return {
+    return ORJSONResponse({
         "status": "healthy" if all(health.values()) else "degraded",
-        "timestamp": datetime.now(timezone.utc),
+        "timestamp": current_iso_ts(),
         "services": health,
         "version": settings.APP_VERSION
-    }
+    })
 
 
 # @app.get("/", response_model=HealthResponse)
@@ -109,18 +133,18 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
-    health = pipeline.health_check()
+    health = await pipeline.health_check()
     inbound_health = await inbound_service.health_check()
     
-    return {
+    return ORJSONResponse({
         "status": "healthy" if all(health.values()) and all(inbound_health.values()) else "degraded",
         "services": {
             **health,
             "inbound_service": inbound_health
         },
         "connections": manager.get_connection_count(),
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
+        "timestamp": current_iso_ts()
+    })
 
 # REST API Endpoints
 
@@ -131,10 +155,16 @@ async def process_audio(audio: UploadFile = File(...), language: str = "en"):
     Audio → STT → AI → TTS → Response
     """
     try:
-        audio_data = await audio.read()
-        call_id = f"rest_{datetime.now(timezone.utc).timestamp()}"
+        call_id = f"rest_{time.monotonic_ns()}"
         
-        result = await pipeline.process_audio(audio_data, call_id, language)
+        # Spool the upload to disk in chunks rather than holding it in RAM
+        async with aiofiles.tempfile.NamedTemporaryFile(suffix=".wav") as tmp:
+            while chunk := await audio.read(UPLOAD_CHUNK_SIZE):
+                await tmp.write(chunk)
+            await tmp.flush()
+            
+            # STT admission control lives in STTService (shared with the /ws path)
+            result = await pipeline.process_audio(Path(tmp.name), call_id, language)
         
         return result
         
@@ -153,7 +183,7 @@ async def process_text(data: dict):
         if not text:
             raise HTTPException(status_code=400, detail="Text is required")
         
-        call_id = data.get("call_id", f"rest_{datetime.now(timezone.utc).timestamp()}")
+        call_id = data.get("call_id", f"rest_{time.monotonic_ns()}")
         
         result = await pipeline.process_text(text, call_id)
         
@@ -218,11 +248,78 @@ async def reset_conversation(call_id: str):
 @app.get("/stats")
 async def get_stats():
     """Get service statistics"""
-    return {
+    return ORJSONResponse({
         "active_connections": manager.get_connection_count(),
         "total_calls": len(pipeline.ai.conversation_history),
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
+        "timestamp": current_iso_ts()
+    })
+
+# WebSocket message handlers
+# Each returns False to end the call, anything else keeps the socket open
+
+async def _handle_audio_chunk(data: dict, call_id: str, websocket: WebSocket):
+    """Process audio through the full pipeline"""
+    audio = data.get("audio")
+    if audio is None:
+        # JSON header frame: raw audio follows as the next binary frame
+        audio_bytes = await manager.receive_bytes(call_id)
+    elif isinstance(audio, str):
+        # Legacy JSON clients sending hex inline
+        audio_bytes = bytes.fromhex(audio)
+    else:
+        audio_bytes = audio
+    
+    # Process through pipeline
+    result = await pipeline.process_audio(audio_bytes, call_id, hex_audio=False)
+    
+    if result["success"]:
+        # Send transcription, AI text and audio as one turn
+        manager.enqueue_audio(call_id, {
+            "type": "turn_result",
+            "transcription": result["transcription"],
+            "ai_response": result["ai_response"],
+            "format": result["audio_format"],
+            "call_id": call_id
+        }, result["audio_data"])
+    else:
+        # Send error
+        manager.enqueue(call_id, {
+            "type": "error",
+            "error": result.get("error", "Unknown error"),
+            "call_id": call_id
+        })
+
+async def _handle_text_message(data: dict, call_id: str, websocket: WebSocket):
+    """Process text directly (skip STT)"""
+    result = await pipeline.process_text(data.get("text"), call_id, hex_audio=False)
+    
+    if result["success"]:
+        manager.enqueue_audio(call_id, {
+            "type": "ai_response",
+            "text": result["ai_response"],
+            "format": result["audio_format"],
+            "call_id": call_id
+        }, result["audio_data"])
+
+async def _handle_reset(data: dict, call_id: str, websocket: WebSocket):
+    """Reset conversation"""
+    pipeline.reset_conversation(call_id)
+    manager.enqueue(call_id, {
+        "type": "reset_complete",
+        "call_id": call_id
+    })
+
+async def _handle_end_call(data: dict, call_id: str, websocket: WebSocket):
+    """Client hung up"""
+    logger.info(f"Call ended by client: {call_id}")
+    return False
+
+WS_HANDLERS = {
+    "audio_chunk": _handle_audio_chunk,
+    "text_message": _handle_text_message,
+    "reset": _handle_reset,
+    "end_call": _handle_end_call
+}
 
 # WebSocket endpoint
 
@@ -232,87 +329,20 @@ async def websocket_endpoint(websocket: WebSocket, call_id: str):
     WebSocket endpoint for real-time voice processing
     Handles bidirectional streaming audio
     """
-    await manager.connect(websocket, call_id)
-    logger.info(f"WebSocket connected: {call_id}")
+    if not await manager.connect(websocket, call_id):
+        return
+    logger.info(f"WebSocket connected: {call_id} ({'msgpack' if manager.uses_msgpack(call_id) else 'json'})")
     
     try:
         while True:
-            # Receive message
-            data = await websocket.receive_json()
+            # Receive message (msgpack frames carry raw audio bytes inline)
+            data = await manager.receive_message(call_id)
             message_type = data.get("type")
             
             logger.info(f"[{call_id}] Received: {message_type}")
             
-            if message_type == "audio_chunk":
-                # Process audio
-                audio_hex = data.get("audio")
-                audio_bytes = bytes.fromhex(audio_hex)
-                
-                # Process through pipeline
-                result = await pipeline.process_audio(audio_bytes, call_id) # edge-tts==6.1.9 # FREE Microsoft TTS (better quality than pyttsx3)
-                # pyttsx3==2.90 # Fallback option
-                
-                if result["success"]:
-                    # Send transcription
-                    await manager.send_message(call_id, {
-                        "type": "transcription",
-                        "text": result["transcription"],
-                        "call_id": call_id
-                    })
-                    
-                    # Send AI response text
-                    await manager.send_message(call_id, {
-                        "type": "ai_response",
-                        "text": result["ai_response"],
-                        "call_id": call_id
-                    })
-                    
-                    # Send audio response
-                    await manager.send_message(call_id, {
-                        "type": "audio_response",
-                        "audio": result["audio_data"],
-                        "format": result["audio_format"],
-                        "call_id": call_id
-                    })
-                else:
-                    # Send error
-                    await manager.send_message(call_id, {
-                        "type": "error",
-                        "error": result.get("error", "Unknown error"),
-                        "call_id": call_id
-                    })
-            
-            elif message_type == "text_message":
-                # Process text directly
-                text = data.get("text")
-                result = await pipeline.process_text(text, call_id)
-                
-                if result["success"]:
-                    await manager.send_message(call_id, {
-                        "type": "ai_response",
-                        "text": result["ai_response"],
-                        "audio": result["audio_data"],
-                        "format": result["audio_format"],
-                        "call_id": call_id
-                    })
-            
-            elif message_type == "reset":
-                # Reset conversation
-                pipeline.reset_conversation(call_id)
-                await manager.send_message(call_id, {
-                    "type": "reset_complete",
-                    "call_id": call_id
-                })
-            
-            elif message_type == "ping":
-                # Respond to ping
-                await manager.send_message(call_id, {
-                    "type": "pong",
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                })
-            
-            elif message_type == "end_call":
-                logger.info(f"Call ended by client: {call_id}")
+            handler = WS_HANDLERS.get(message_type)
+            if handler is not None and await handler(data, call_id, websocket) is False:
                 break
                 
     except WebSocketDisconnect:
@@ -320,7 +350,7 @@ async def websocket_endpoint(websocket: WebSocket, call_id: str):
     except Exception as e:
         logger.error(f"WebSocket error [{call_id}]: {str(e)}")
     finally:
-        manager.disconnect(call_id)
+        await manager.disconnect(call_id, websocket)
         pipeline.reset_conversation(call_id)
 
 # Register routers
@@ -333,5 +363,11 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
-        log_level=settings.LOG_LEVEL.lower()
+        log_level=settings.LOG_LEVEL.lower(),
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        # Liveness via protocol-level PING/PONG control frames
+        ws_ping_interval=settings.WS_HEARTBEAT_INTERVAL,
+        ws_ping_timeout=settings.WS_HEARTBEAT_INTERVAL * 2
     )
\ No newline at end of file
@@ -5,6 +5,7 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from typing import Optional, List
 import os
+from functools import cached_property
 from pathlib import Path
 import json
 
@@ -26,6 +27,8 @@ class Settings(BaseSettings):
     WHISPER_MODEL: str = "distil-whisper-large-v3-en" # Groq Cloud Model
     WHISPER_DEVICE: str = "cpu"                 # Ignored for Cloud STT
     WHISPER_LANGUAGE: str = "en"
+    STT_DECODER: str = "ffmpeg"                 # ffmpeg (16kHz mono FLAC before upload) or none
+    STT_MAX_CONCURRENT: int = 16                # Concurrent STT sessions (decode + Groq request)
     
     # AI Configuration
     AI_PROVIDER: str = "groq"                   # groq or mistral
@@ -39,11 +42,14 @@ class Settings(BaseSettings):
     TTS_VOICE: str = "en-US-AriaNeural"         # Edge TTS voice
     TTS_RATE: str = "+0%"                       # Speech rate
     TTS_VOLUME: str = "+0%"                     # Volume
+    TTS_CACHE_SIZE: int = 128                   # Cached utterances (LRU, in memory)
+    TTS_CACHE_MAX_CHARS: int = 120              # Only utterances up to this length are cached
     
     # WebSocket
     WS_HEARTBEAT_INTERVAL: int = 30
     WS_MAX_CONNECTIONS: int = 100
     WS_MESSAGE_QUEUE_SIZE: int = 100
+    WS_DRAIN_TIMEOUT: float = 5.0               # Seconds to flush queued replies on disconnect
     
     # Audio Processing
     AUDIO_SAMPLE_RATE: int = 16000
@@ -74,9 +80,9 @@ class Settings(BaseSettings):
     ENABLE_METRICS: bool = False
     METRICS_PORT: int = 9090
     
-    @property
+    @cached_property
     def CORS_ORIGINS(self) -> List[str]:
-        """Parsed CORS origins as list[str] for FastAPI usage."""
+        """Parsed CORS origins as list[str] for FastAPI usage (parsed once)."""
         raw = self.CORS_ORIGINS_RAW
         if not raw:
             return ["*"]
@@ -1,16 +1,38 @@
 """
 WebSocket Connection Manager
-Handles multiple concurrent connections with heartbeat
+Handles multiple concurrent connections (liveness via protocol-level WebSocket pings)
 """
 import asyncio
-from typing import Dict, Set
-from fastapi import WebSocket
+import time
+from typing import Dict, List, Set, Tuple, Union
+import msgpack
+import orjson
+from fastapi import WebSocket, WebSocketDisconnect
 from datetime import datetime
 from config.settings import settings
 from utils.logger import setup_logger
+from utils.clock import UTC, current_iso_ts
 
 logger = setup_logger(__name__)
 
+# WebSocket subprotocol for binary MessagePack framing (raw audio bytes, no hex)
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+# Subprotocols accepted, in preference order when a client offers several
+SUPPORTED_SUBPROTOCOLS = (MSGPACK_SUBPROTOCOL,)
+
+# Queued by disconnect(): the writer flushes everything ahead of it, then exits
+_DRAIN = object()
+
+
+def encode_frame(payload, protocol: str) -> Union[bytes, str]:
+    """Encode a message (or array of messages) for the given connection protocol"""
+    if protocol == MSGPACK_SUBPROTOCOL:
+        return msgpack.packb(payload, use_bin_type=True)
+    # Compact UTF-8 JSON text, same shape as Starlette's send_json
+    return orjson.dumps(payload).decode()
+
+
 class ConnectionManager:
     """Manages WebSocket connections"""
     
@@ -21,84 +43,230 @@ class ConnectionManager:
         # Connection metadata
         self.connection_info: Dict[str, dict] = {}
         
-        # Heartbeat tasks
-        self.heartbeat_tasks: Dict[str, asyncio.Task] = {}
+        # Outbound message queues and their writer tasks
+        self.out_queues: Dict[str, asyncio.Queue] = {}
+        self.writer_tasks: Dict[str, asyncio.Task] = {}
         
         # Room-based connections for broadcasting
         self.rooms: Dict[str, Set[str]] = {}
         
         logger.info("✓ Connection Manager initialized")
     
-    async def connect(self, websocket: WebSocket, call_id: str):
-        """Accept new WebSocket connection"""
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, call_id: str) -> bool:
+        """
+        Accept new WebSocket connection, negotiating msgpack framing if offered
+        
+        Returns False (after closing with 1013 "Try Again Later") when
+        WS_MAX_CONNECTIONS is already reached.
+        """
+        offered = websocket.scope.get("subprotocols", [])
+        subprotocol = next((p for p in SUPPORTED_SUBPROTOCOLS if p in offered), None)
+        
+        await websocket.accept(subprotocol=subprotocol)
+        
+        if call_id in self.active_connections:
+            # Same call_id reconnecting: stop the previous connection's writer before replacing them
+            logger.warning(f"Replacing existing connection: {call_id}")
+            await self.disconnect(call_id, drain=False)
+        
+        if len(self.active_connections) >= settings.WS_MAX_CONNECTIONS:
+            logger.warning(f"Connection rejected, server busy: {call_id} (Total: {len(self.active_connections)})")
+            await websocket.close(code=1013, reason="server busy")
+            return False
+        
         self.active_connections[call_id] = websocket
         self.connection_info[call_id] = {
-            "connected_at": datetime.utcnow(),
+            "protocol": subprotocol or "json",
+            "connected_at": datetime.now(UTC),
             "messages_sent": 0,
             "messages_received": 0,
-            "last_activity": datetime.utcnow()
+            "last_activity": time.monotonic()
         }
         
-        # Start heartbeat
-        self.heartbeat_tasks[call_id] = asyncio.create_task(
-            self._heartbeat(call_id)
+        # Start outbound writer
+        queue = asyncio.Queue(maxsize=settings.WS_MESSAGE_QUEUE_SIZE)
+        self.out_queues[call_id] = queue
+        self.writer_tasks[call_id] = asyncio.create_task(
+            self._writer(call_id, queue)
         )
         
         logger.info(f"✓ Connection established: {call_id} (Total: {len(self.active_connections)})")
+        return True
     
-    def disconnect(self, call_id: str):
-        """Remove connection"""
-        if call_id in self.active_connections:
-            # Cancel heartbeat
-            if call_id in self.heartbeat_tasks:
-                self.heartbeat_tasks[call_id].cancel()
-                del self.heartbeat_tasks[call_id]
-            
-            # Remove connection
-            del self.active_connections[call_id]
-            del self.connection_info[call_id]
-            
-            logger.info(f"✗ Connection closed: {call_id} (Total: {len(self.active_connections)})")
+    async def disconnect(self, call_id: str, websocket: WebSocket = None, drain: bool = True):
+        """
+        Remove connection
+        
+        With drain, messages already queued (e.g. the reply to the last
+        request before end_call) are flushed first, for up to WS_DRAIN_TIMEOUT
+        seconds. When websocket is given, nothing happens unless it is still
+        the connection registered for call_id (it may have been replaced).
+        """
+        if call_id not in self.active_connections:
+            return
+        if websocket is not None and self.active_connections[call_id] is not websocket:
+            return
+        
+        # Flush, then stop the outbound writer
+        writer = self.writer_tasks.pop(call_id, None)
+        queue = self.out_queues.pop(call_id, None)
+        if writer is not None:
+            if drain and not writer.done():
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(_DRAIN)
+                try:
+                    await asyncio.wait_for(writer, settings.WS_DRAIN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Outbound drain timed out [{call_id}]")
+            writer.cancel()
+        
+        # Remove connection
+        self.active_connections.pop(call_id, None)
+        self.connection_info.pop(call_id, None)
+        
+        logger.info(f"✗ Connection closed: {call_id} (Total: {len(self.active_connections)})")
+    
+    async def receive_message(self, call_id: str) -> dict:
+        """Receive and decode the next message from a connection"""
+        websocket = self.active_connections[call_id]
+        
+        if self.uses_msgpack(call_id):
+            message = msgpack.unpackb(await websocket.receive_bytes(), raw=False)
+        else:
+            # JSON clients may send text or binary frames; orjson parses either
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            raw = frame.get("bytes")
+            message = orjson.loads(raw if raw is not None else frame["text"])
+        
+        self.connection_info[call_id]["messages_received"] += 1
+        self.connection_info[call_id]["last_activity"] = time.monotonic()
+        return message
+    
+    async def receive_bytes(self, call_id: str) -> bytes:
+        """Receive the next binary frame (raw audio following a JSON header)"""
+        data = await self.active_connections[call_id].receive_bytes()
+        self.connection_info[call_id]["messages_received"] += 1
+        self.connection_info[call_id]["last_activity"] = time.monotonic()
+        return data
+    
+    def enqueue_audio(self, call_id: str, message: dict, audio: bytes) -> bool:
+        """
+        Queue a message carrying audio
+        
+        msgpack clients get the raw bytes inline under "audio"; JSON clients
+        get the metadata frame followed by the audio as a raw binary frame.
+        The pair is queued as one item so it is sent (or dropped) together.
+        """
+        if self.uses_msgpack(call_id):
+            return self.enqueue(call_id, {**message, "audio": audio})
+        
+        return self.enqueue(call_id, ({**message, "audio_bytes": len(audio)}, audio))
+    
+    def enqueue(self, call_id: str, message: Union[dict, bytes, str, Tuple[dict, bytes]]) -> bool:
+        """Queue a message (or pre-encoded frame) for the connection's writer task without waiting"""
+        queue = self.out_queues.get(call_id)
+        if queue is None:
+            return False
+        
+        if queue.full():
+            # Drop the oldest message so a slow client never blocks the pipeline
+            try:
+                queue.get_nowait()
+                logger.warning(f"Outbound queue full, dropped oldest message [{call_id}]")
+            except asyncio.QueueEmpty:
+                pass
+        
+        queue.put_nowait(message)
+        return True
     
     async def send_message(self, call_id: str, message: dict):
         """Send message to specific connection"""
-        if call_id in self.active_connections:
-            try:
-                websocket = self.active_connections[call_id]
-                await websocket.send_json(message)
-                
-                # Update stats
-                self.connection_info[call_id]["messages_sent"] += 1
-                self.connection_info[call_id]["last_activity"] = datetime.utcnow()
-                
-            except Exception as e:
-                logger.error(f"Send error [{call_id}]: {str(e)}")
-                self.disconnect(call_id)
+        self.enqueue(call_id, message)
     
-    async def broadcast(self, message: dict, exclude: Set[str] = None):
-        """Broadcast message to all connections"""
-        exclude = exclude or set()
-        
-        for call_id in list(self.active_connections.keys()):
-            if call_id not in exclude:
-                await self.send_message(call_id, message)
+    async def send_batch(self, call_id: str, messages: List[dict]):
+        """Send several messages to a connection; the writer merges them into one frame"""
+        for message in messages:
+            self.enqueue(call_id, message)
     
-    async def _heartbeat(self, call_id: str):
-        """Send periodic heartbeat to keep connection alive"""
+    async def _writer(self, call_id: str, queue: asyncio.Queue):
+        """
+        Drain the outbound queue, merging adjacent messages into a single frame
+        
+        Exits after flushing on the disconnect sentinel, or on the first send error.
+        """
         try:
-            while call_id in self.active_connections:
-                await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL)
+            while True:
+                pending = [await queue.get()]
+                while not queue.empty():
+                    pending.append(queue.get_nowait())
                 
-                if call_id in self.active_connections:
-                    await self.send_message(call_id, {
-                        "type": "heartbeat",
-                        "timestamp": datetime.utcnow().isoformat()
-                    })
+                batch = []
+                for item in pending:
+                    if item is _DRAIN:
+                        await self._send_batch_frame(call_id, batch)
+                        return
+                    if isinstance(item, (bytes, str)):
+                        # Pre-encoded broadcast frame: flush merged messages first to keep order
+                        await self._send_batch_frame(call_id, batch)
+                        batch = []
+                        await self._send_frame(call_id, item)
+                    elif isinstance(item, tuple):
+                        # Audio header and its binary frame, sent back-to-back
+                        await self._send_batch_frame(call_id, batch)
+                        batch = []
+                        header, audio = item
+                        await self._send_frame(call_id, encode_frame(header, self._protocol(call_id)))
+                        await self._send_frame(call_id, audio)
+                    else:
+                        batch.append(item)
+                await self._send_batch_frame(call_id, batch)
         except asyncio.CancelledError:
             pass
         except Exception as e:
-            logger.error(f"Heartbeat error [{call_id}]: {str(e)}")
+            # Socket is gone; the receive loop sees the disconnect and cleans up
+            logger.error(f"Send error [{call_id}]: {str(e)}")
+    
+    async def _send_batch_frame(self, call_id: str, batch: List[dict]):
+        """Send merged messages as one frame (a single message is sent unwrapped)"""
+        if batch:
+            payload = batch[0] if len(batch) == 1 else batch
+            await self._send_frame(call_id, encode_frame(payload, self._protocol(call_id)), len(batch))
+    
+    async def _send_frame(self, call_id: str, frame: Union[bytes, str], count: int = 1):
+        """Write one already-encoded frame"""
+        websocket = self.active_connections.get(call_id)
+        if websocket is not None:
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
+            
+            # Update stats
+            self.connection_info[call_id]["messages_sent"] += count
+            self.connection_info[call_id]["last_activity"] = time.monotonic()
+    
+    def _fan_out(self, call_ids, message: dict):
+        """Encode a shared message once per protocol and queue it for every recipient"""
+        frames: Dict[str, Union[bytes, str]] = {}
+        for call_id in list(call_ids):
+            protocol = self._protocol(call_id)
+            if protocol is None:
+                continue
+            if protocol not in frames:
+                frames[protocol] = encode_frame(message, protocol)
+            self.enqueue(call_id, frames[protocol])
+    
+    async def broadcast(self, message: dict, exclude: Set[str] = None):
+        """Broadcast message to all connections"""
+        exclude = exclude or set()
+        
+        self._fan_out(
+            (call_id for call_id in self.active_connections if call_id not in exclude),
+            message
+        )
     
     def get_connection_count(self) -> int:
         """Get number of active connections"""
@@ -108,6 +276,14 @@ class ConnectionManager:
         """Get connection metadata"""
         return self.connection_info.get(call_id, {})
     
+    def uses_msgpack(self, call_id: str) -> bool:
+        """Check if connection negotiated binary msgpack framing"""
+        return self._protocol(call_id) in SUPPORTED_SUBPROTOCOLS
+    
+    def _protocol(self, call_id: str):
+        """Negotiated framing protocol for a connection (None if not connected)"""
+        return self.connection_info.get(call_id, {}).get("protocol")
+    
     def is_connected(self, call_id: str) -> bool:
         """Check if connection exists"""
         return call_id in self.active_connections
@@ -117,13 +293,13 @@ class ConnectionManager:
         logger.info("Closing all connections...")
         
         for call_id in list(self.active_connections.keys()):
+            websocket = self.active_connections[call_id]
             try:
-                websocket = self.active_connections[call_id]
+                # Flush queued replies before closing the socket
+                await self.disconnect(call_id)
                 await websocket.close()
             except:
                 pass
-            finally:
-                self.disconnect(call_id)
         
         logger.info("✓ All connections closed")
     
@@ -146,15 +322,14 @@ class ConnectionManager:
     async def send_to_room(self, room_name: str, message: dict):
         """Send message to all connections in a room"""
         if room_name in self.rooms:
-            for call_id in self.rooms[room_name]:
-                await self.send_message(call_id, message)
+            self._fan_out(self.rooms[room_name], message)
     
     async def broadcast_queue_update(self, queue_data: dict):
         """Broadcast queue updates to monitoring connections"""
         await self.send_to_room("queue_monitor", {
             "type": "queue_update",
             "data": queue_data,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": current_iso_ts()
         })
     
     async def broadcast_call_update(self, call_data: dict):
@@ -162,7 +337,7 @@ class ConnectionManager:
         await self.send_to_room("call_monitor", {
             "type": "call_update", 
             "data": call_data,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": current_iso_ts()
         })
     
     def get_room_connections(self, room_name: str) -> Set[str]:
@@ -3,7 +3,8 @@ Main AI Pipeline: STT → AI → TTS
 Orchestrates the complete voice processing flow
 """
 import time
-from typing import Dict
+from pathlib import Path
+from typing import Dict, Union
 from services.stt_service import STTService
 from services.ai_service import AIService
 from services.tts_service import TTSService
@@ -23,17 +24,19 @@ class AIPipeline:
     
     async def process_audio(
         self,
-        audio_data: bytes,
+        audio_data: Union[bytes, Path],
         call_id: str,
-        language: str = "en"
+        language: str = "en",
+        hex_audio: bool = True
     ) -> Dict:
         """
         Complete pipeline: Audio → Text → AI → Speech
         
         Args:
-            audio_data: Input audio bytes
+            audio_data: Input audio bytes, or path to an audio file on disk
             call_id: Unique call identifier
             language: Language code
+            hex_audio: Hex-encode output audio (False returns raw bytes)
         
         Returns:
             Complete pipeline response with all stages
@@ -43,7 +46,10 @@ class AIPipeline:
         try:
             # Stage 1: Speech-to-Text
             logger.info(f"[{call_id}] Stage 1: STT")
-            stt_result = await self.stt.transcribe_audio(audio_data, language)
+            if isinstance(audio_data, Path):
+                stt_result = await self.stt.transcribe_file(str(audio_data), language)
+            else:
+                stt_result = await self.stt.transcribe_audio(audio_data, language)
             
             if not stt_result["success"]:
                 return self._error_response(
@@ -89,7 +95,7 @@ class AIPipeline:
                 "call_id": call_id,
                 "transcription": user_text,
                 "ai_response": ai_response,
-                "audio_data": tts_result["audio_data"].hex(),
+                "audio_data": self._encode_audio(tts_result["audio_data"], hex_audio),
                 "audio_format": tts_result["format"],
                 "total_duration": total_duration,
                 "breakdown": {
@@ -108,13 +114,14 @@ class AIPipeline:
             logger.error(f"[{call_id}] Pipeline error: {str(e)}")
             return self._error_response(call_id, "Pipeline error", str(e))
     
-    async def process_text(self, text: str, call_id: str) -> Dict:
+    async def process_text(self, text: str, call_id: str, hex_audio: bool = True) -> Dict:
         """
         Process text input directly (skip STT)
         
         Args:
             text: User input text
             call_id: Unique call identifier
+            hex_audio: Hex-encode output audio (False returns raw bytes)
         
         Returns:
             AI response with audio
@@ -143,7 +150,7 @@ class AIPipeline:
                 "success": True,
                 "call_id": call_id,
                 "ai_response": ai_response,
-                "audio_data": tts_result["audio_data"].hex(),
+                "audio_data": self._encode_audio(tts_result["audio_data"], hex_audio),
                 "audio_format": tts_result["format"],
                 "total_duration": total_duration,
                 "breakdown": {
@@ -160,14 +167,19 @@ class AIPipeline:
         """Reset conversation history"""
         self.ai.reset_conversation(call_id)
     
-    def health_check(self) -> Dict:
+    async def health_check(self) -> Dict:
         """Check health of all services"""
         return {
             "stt": self.stt.health_check(),
-            "ai": self.ai.health_check(),
+            "ai": await self.ai.health_check(),
             "tts": self.tts.health_check()
         }
     
+    @staticmethod
+    def _encode_audio(audio_data: bytes, hex_audio: bool):
+        """Hex-encode audio for JSON transports, pass raw bytes through otherwise"""
+        return audio_data.hex() if hex_audio else audio_data
+    
     def _error_response(self, call_id: str, stage: str, error: str) -> Dict:
         """Generate error response"""
         return {
@@ -115,12 +115,12 @@ async def generate_edge_tts(
             volume=volume
         )
 
-        audio_data = b""
+        audio_buf = bytearray()
         async for chunk in communicate.stream():
             if chunk["type"] == "audio":
-                audio_data += chunk["data"]
+                audio_buf.extend(chunk["data"])
 
-        return audio_data
+        return bytes(audio_buf)
 
     except Exception as e:
         error_msg = str(e)
@@ -2,21 +2,75 @@
 Inbound Call Management Router
 Simplified router that delegates to Node.js backend for all inbound operations
 """
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timezone
 import asyncio
+import hashlib
 import logging
+import orjson
 
 from services.inbound_service import inbound_service
+from utils.clock import current_iso_ts
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 router = APIRouter(prefix="/inbound", tags=["inbound"])
 
+# Static IVR / routing payloads, encoded once at import with a content ETag
+_IVR_CONFIGS = {
+    "main": {
+        "greeting": "Welcome to our AI assistant. Please choose from the following options:",
+        "menu": [
+            {"key": "1", "text": "For sales and support, press 1", "action": "route_to_sales"},
+            {"key": "2", "text": "For technical support, press 2", "action": "route_to_tech"},
+            {"key": "3", "text": "For billing inquiries, press 3", "action": "route_to_billing"},
+            {"key": "4", "text": "To speak with our AI assistant, press 4", "action": "route_to_ai"}
+        ],
+        "timeout": 10,
+        "max_attempts": 3,
+        "invalid_input_message": "Invalid selection. Please try again."
+    }
+}
+
+_ROUTING_RULES = {
+    "vip_customers": {
+        "name": "VIP Customers",
+        "priority": 10,
+        "enabled": True,
+        "conditions": [{"field": "user.vip", "operator": "equals", "value": True}],
+        "actions": ["priority_queue", "route_to_ai"],
+        "description": "Route VIP customers to priority queue with AI assistant"
+    },
+    "business_hours": {
+        "name": "Business Hours",
+        "priority": 5,
+        "enabled": True,
+        "conditions": [{"field": "time", "operator": "in_hours", "value": {"start": 9, "end": 17}}],
+        "actions": ["ivr_main"],
+        "description": "During business hours, route to main IVR menu"
+    }
+}
+
+def _etag(body: bytes) -> str:
+    """Strong ETag from the encoded body"""
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+_IVR_CONFIGS_BODY = orjson.dumps(_IVR_CONFIGS)
+_IVR_CONFIGS_ETAG = _etag(_IVR_CONFIGS_BODY)
+_ROUTING_RULES_BODY = orjson.dumps(_ROUTING_RULES)
+_ROUTING_RULES_ETAG = _etag(_ROUTING_RULES_BODY)
+
+def _cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve pre-encoded JSON, answering 304 when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": "max-age=60"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # Pydantic Models for API validation
 class AnalyticsRequest(BaseModel):
     period: str = Field(default="today", description="Time period")
@@ -47,6 +101,15 @@ async def get_analytics(period: str = "today"):
         logger.error(f"Get analytics error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/dashboard")
+async def get_dashboard(period: str = "today"):
+    """Get queue status and analytics in one call (fetched concurrently)"""
+    try:
+        return await inbound_service.fetch_dashboard(period)
+    except Exception as e:
+        logger.error(f"Get dashboard error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/queues")
 async def get_queue_status():
     """Get queue status from Node.js backend"""
@@ -70,28 +133,11 @@ async def get_specific_queue(queue_name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/ivr/configs")
-async def get_ivr_configs():
+async def get_ivr_configs(request: Request):
     """Get IVR configurations from Node.js backend"""
-    try:
-        # This would fetch from Node.js backend
-        # For now, return basic structure
-        return {
-            "main": {
-                "greeting": "Welcome to our AI assistant. Please choose from the following options:",
-                "menu": [
-                    {"key": "1", "text": "For sales and support, press 1", "action": "route_to_sales"},
-                    {"key": "2", "text": "For technical support, press 2", "action": "route_to_tech"},
-                    {"key": "3", "text": "For billing inquiries, press 3", "action": "route_to_billing"},
-                    {"key": "4", "text": "To speak with our AI assistant, press 4", "action": "route_to_ai"}
-                ],
-                "timeout": 10,
-                "max_attempts": 3,
-                "invalid_input_message": "Invalid selection. Please try again."
-            }
-        }
-    except Exception as e:
-        logger.error(f"Get IVR configs error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # This would fetch from Node.js backend
+    # For now, serve the pre-encoded basic structure
+    return _cached_json_response(request, _IVR_CONFIGS_BODY, _IVR_CONFIGS_ETAG)
 
 @router.post("/ivr/configs")
 async def update_ivr_config(menu_name: str, config: IVRMenu):
@@ -125,32 +171,11 @@ async def test_ivr_menu(menu_name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/routing/rules")
-async def get_routing_rules():
+async def get_routing_rules(request: Request):
     """Get routing rules from Node.js backend"""
-    try:
-        # This would fetch from Node.js backend
-        # For now, return basic structure
-        return {
-            "vip_customers": {
-                "name": "VIP Customers",
-                "priority": 10,
-                "enabled": True,
-                "conditions": [{"field": "user.vip", "operator": "equals", "value": True}],
-                "actions": ["priority_queue", "route_to_ai"],
-                "description": "Route VIP customers to priority queue with AI assistant"
-            },
-            "business_hours": {
-                "name": "Business Hours",
-                "priority": 5,
-                "enabled": True,
-                "conditions": [{"field": "time", "operator": "in_hours", "value": {"start": 9, "end": 17}}],
-                "actions": ["ivr_main"],
-                "description": "During business hours, route to main IVR menu"
-            }
-        }
-    except Exception as e:
-        logger.error(f"Get routing rules error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # This would fetch from Node.js backend
+    # For now, serve the pre-encoded basic structure
+    return _cached_json_response(request, _ROUTING_RULES_BODY, _ROUTING_RULES_ETAG)
 
 @router.post("/routing/rules")
 async def update_routing_rule(rule: RoutingRule):
@@ -192,22 +217,50 @@ async def export_analytics(period: str = "today", format: str = "json"):
         # This would call Node.js backend for export
         logger.info(f"Analytics export requested: {period} in {format} format")
         
-        # For now, return basic CSV data
         if format == "csv":
-            csv_data = "Metric,Value\nTotal Calls,25\nCompleted Calls,20\nSuccess Rate,80%\n"
-            return JSONResponse(
-                content=csv_data,
+            # Stream rows as they are produced instead of building the file in memory
+            return StreamingResponse(
+                _csv_rows(period),
                 media_type="text/csv",
                 headers={"Content-Disposition": f"attachment; filename=analytics-{period}.csv"}
             )
         else:
             # Return JSON for other formats
             analytics = await inbound_service.get_analytics(period)
-            return analytics
+            return ORJSONResponse(analytics)
     except Exception as e:
         logger.error(f"Export analytics error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _csv_rows(period: str):
+    """CSV header followed by analytics rows from the Node.js backend"""
+    yield "Metric,Value\n"
+    async for row in inbound_service.stream_analytics_rows(period):
+        yield row
+
+# Queue monitor status frame, encoded once per tick and shared by all monitor sockets
+_STATUS_INTERVAL = 30
+_status_frame = ""
+_status_tick = asyncio.Event()
+
+async def run_status_ticker():
+    """Publish a freshly encoded status frame to monitor sockets every interval"""
+    global _status_frame, _status_tick
+    try:
+        while True:
+            await asyncio.sleep(_STATUS_INTERVAL)
+            _status_frame = orjson.dumps({
+                "type": "status",
+                "message": "Connected to Python backend (queue monitoring delegated to Node.js)",
+                "timestamp": current_iso_ts()
+            }).decode()
+            
+            # Swap in a fresh event so waiters wake exactly once per tick
+            tick, _status_tick = _status_tick, asyncio.Event()
+            tick.set()
+    except asyncio.CancelledError:
+        pass
+
 # WebSocket endpoint for real-time queue monitoring (delegated to Node.js)
 @router.websocket("/queues/monitor")
 async def websocket_queue_monitor(websocket: WebSocket):
@@ -221,17 +274,14 @@ async def websocket_queue_monitor(websocket: WebSocket):
             "type": "info",
             "message": "Queue monitoring is handled by Node.js backend",
             "nodejs_url": "https://technova-hub-voice-backend-node-hxg7.onrender.com/inbound/queues/monitor",
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": current_iso_ts()
         })
         
-        # Keep connection alive with periodic status updates
+        # Keep connection alive with the shared status frame (every 30 seconds)
         while True:
-            await asyncio.sleep(30)  # Send status every 30 seconds
-            await websocket.send_json({
-                "type": "status",
-                "message": "Connected to Python backend (queue monitoring delegated to Node.js)",
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            })
+            tick = _status_tick
+            await tick.wait()
+            await websocket.send_text(_status_frame)
             
     except WebSocketDisconnect:
         logger.info("Queue monitor WebSocket disconnected")
@@ -244,16 +294,16 @@ async def inbound_health_check():
     """Check health of inbound service integration"""
     try:
         health = await inbound_service.health_check()
-        return {
+        return ORJSONResponse({
             "status": "healthy" if all(health.values()) else "degraded",
             "nodejs_backend": health,
             "python_service": True,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+            "timestamp": current_iso_ts()
+        })
     except Exception as e:
         logger.error(f"Inbound health check error: {str(e)}")
-        return {
+        return ORJSONResponse({
             "status": "unhealthy",
             "error": str(e),
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+            "timestamp": current_iso_ts()
+        })
@@ -4,13 +4,17 @@ Groq is 10x faster than GPT-4 and completely FREE
 """
 import time
 from typing import List, Dict, Optional
-from groq import Groq
+from groq import AsyncGroq
 from config.settings import settings
 from utils.logger import setup_logger
 from utils.exceptions import AIException
 
 logger = setup_logger(__name__)
 
+# Health probes within this window reuse the previous result
+HEALTH_CACHE_SECONDS = 10
+HEALTH_TIMEOUT = 3
+
 class AIService:
     """AI Service using Groq (FREE and FAST)"""
     
@@ -18,7 +22,11 @@ class AIService:
         if not settings.GROQ_API_KEY:
             raise AIException("GROQ_API_KEY not configured")
         
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        # Async client: completions are awaited on the event loop, never block it
+        self.client = AsyncGroq(api_key=settings.GROQ_API_KEY)
+        
+        # Last health probe: (checked_at, healthy)
+        self._last_health = (float("-inf"), False)
         self.conversation_history: Dict[str, List[dict]] = {}
         
         self.system_prompt = """You are a helpful voice assistant. 
@@ -54,7 +62,7 @@ Avoid long paragraphs or technical jargon unless asked."""
             logger.info(f"[{call_id}] Getting AI response for: {user_message}")
             
             # Call Groq API
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=settings.AI_MODEL,
                 messages=messages,
                 temperature=settings.AI_TEMPERATURE,
@@ -128,7 +136,7 @@ Avoid long paragraphs or technical jargon unless asked."""
         try:
             messages = self._build_messages(user_message, call_id)
             
-            stream = self.client.chat.completions.create(
+            stream = await self.client.chat.completions.create(
                 model=settings.AI_MODEL,
                 messages=messages,
                 temperature=settings.AI_TEMPERATURE,
@@ -137,7 +145,7 @@ Avoid long paragraphs or technical jargon unless asked."""
             )
             
             full_response = ""
-            for chunk in stream:
+            async for chunk in stream:
                 if chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
                     full_response += content
@@ -168,15 +176,23 @@ Avoid long paragraphs or technical jargon unless asked."""
         """Get number of messages in conversation"""
         return len(self.conversation_history.get(call_id, []))
     
-    def health_check(self) -> bool:
-        """Check if service is healthy"""
+    async def health_check(self) -> bool:
+        """
+        Check if service is healthy
+        
+        Looks up the configured model (no tokens spent); the result is reused
+        for HEALTH_CACHE_SECONDS so probe floods make one Groq request.
+        """
+        checked_at, healthy = self._last_health
+        if time.monotonic() - checked_at < HEALTH_CACHE_SECONDS:
+            return healthy
+        
         try:
-            # Simple test call
-            response = self.client.chat.completions.create(
-                model=settings.AI_MODEL,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5
-            )
-            return True
-        except:
-            return False
\ No newline at end of file
+            await self.client.models.retrieve(settings.AI_MODEL, timeout=HEALTH_TIMEOUT)
+            healthy = True
+        except Exception as e:
+            logger.error(f"AI health check error: {str(e)}")
+            healthy = False
+        
+        self._last_health = (time.monotonic(), healthy)
+        return healthy
\ No newline at end of file
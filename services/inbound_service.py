@@ -3,33 +3,167 @@ Inbound Call Service
 Integrates with Node.js backend for enhanced inbound call management
 """
 import asyncio
+import errno
+import time
 import aiohttp
-import json
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timezone
+import orjson
+from cachetools import LRUCache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from utils.logger import setup_logger
+from utils.cache import cached
 
 logger = setup_logger(__name__)
 
+try:
+    # c-ares DNS resolution instead of getaddrinfo on the default thread pool
+    import aiodns  # noqa: F401
+    HAS_AIODNS = True
+except ImportError:
+    HAS_AIODNS = False
+
+def _orjson_dumps(obj: Any) -> str:
+    """orjson encoder for aiohttp's json= bodies (aiohttp expects str)"""
+    return orjson.dumps(obj).decode()
+
+# Fallback payloads, built once. Shared and returned as-is: callers must not mutate them.
+# (Plain dicts rather than MappingProxyType so orjson and the pickle cache can still encode them.)
+_MOCK_QUEUE_DATA: Dict[str, Any] = {
+    "sales": {"length": 2, "avg_wait": 45},
+    "tech": {"length": 1, "avg_wait": 30},
+    "billing": {"length": 0, "avg_wait": 0},
+    "priority": {"length": 1, "avg_wait": 15}
+}
+
+_MOCK_ANALYTICS: Dict[str, Any] = {
+    "summary": {
+        "totalCalls": 25,
+        "inboundCalls": 15,
+        "outboundCalls": 10,
+        "completedCalls": 20,
+        "successRate": 80,
+        "avgDuration": 120
+    },
+    "ivrAnalytics": {
+        "totalIVRCalls": 12,
+        "ivrUsageRate": 80,
+        "routingBreakdown": {"sales": 5, "tech": 4, "billing": 2, "ai": 1}
+    },
+    "aiMetrics": {
+        "aiCalls": 8,
+        "aiEngagementRate": 53,
+        "avgResponseTime": 800
+    }
+}
+
+# Dashboard data cache: serve fresh for FRESH seconds, then serve stale while
+# refreshing in the background for up to STALE more seconds
+CACHE_FRESH_SECONDS = 10
+CACHE_STALE_SECONDS = 30
+# Keys include the client-supplied period, so the cache is bounded
+CACHE_MAX_ENTRIES = 64
+
+# Health probes within this window reuse the previous result
+HEALTH_CACHE_SECONDS = 2
+HEALTH_TIMEOUT = aiohttp.ClientTimeout(total=3)
+
 class InboundService:
     """Service for managing inbound calls and integration with Node.js backend"""
     
     def __init__(self):
         self.node_backend_url = "https://technova-hub-voice-backend-node-hxg7.onrender.com"  # Node.js backend URL
         self.session = None
+        self._connector = None
+        self._init_lock = asyncio.Lock()
+        
+        # Fallback TwiML, rendered once; only the CallSid varies per call
+        ws_base = self.node_backend_url.replace("https://", "wss://").replace("http://", "ws://")
+        self._fallback_twiml = '''<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say voice="alice" language="en-US">Connecting you to our AI assistant.</Say>
+    <Connect>
+        <Stream url="''' + ws_base + '''/media/%s" track="both_tracks"/>
+    </Connect>
+</Response>'''
+        
+        # Stale-while-revalidate cache: key -> (value, fresh_until, stale_until)
+        self._cache: LRUCache = LRUCache(maxsize=CACHE_MAX_ENTRIES)
+        # In-flight fetch per key, removed as soon as it finishes
+        self._refresh_tasks: Dict[Tuple, asyncio.Task] = {}
+        
+        # Last health probe: (checked_at, status)
+        self._last_health: Tuple[float, Dict[str, bool]] = (
+            float("-inf"),
+            {"nodejs_backend": False, "api_connection": False}
+        )
         
     async def initialize(self):
         """Initialize HTTP session and connections"""
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30),
-            headers={"Content-Type": "application/json"}
-        )
+        async with self._init_lock:
+            # Concurrent lazy initializers must not create (and leak) a second session
+            if self.session is not None:
+                return
+            
+            # One pooled keep-alive session for all Node.js calls, DNS cached for 5 minutes
+            self._connector = aiohttp.TCPConnector(
+                resolver=aiohttp.AsyncResolver() if HAS_AIODNS else None,
+                use_dns_cache=True,
+                limit=100,
+                limit_per_host=32,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+                enable_cleanup_closed=True
+            )
+            self.session = aiohttp.ClientSession(
+                base_url=self.node_backend_url,
+                connector=self._connector,
+                timeout=aiohttp.ClientTimeout(total=30, connect=5, sock_read=10),
+                headers={"Content-Type": "application/json"},
+                json_serialize=_orjson_dumps
+            )
         logger.info("✓ Inbound Service initialized")
     
+    async def _ensure_session(self):
+        """Create the session on first use if startup initialization did not run"""
+        if self.session is None:
+            await self.initialize()
+    
     async def cleanup(self):
         """Cleanup resources"""
+        for task in list(self._refresh_tasks.values()):
+            task.cancel()
         if self.session:
             await self.session.close()
+            self.session = None
+        if self._connector:
+            await self._connector.close()
+            self._connector = None
+    
+    async def _post_json(self, path: str, payload: Optional[Dict[str, Any]] = None) -> bytes:
+        """
+        POST a JSON payload to the Node.js backend
+        
+        Returns:
+            Raw response body
+        
+        Raises:
+            aiohttp.ClientResponseError on an error status
+        """
+        await self._ensure_session()
+        async with self.session.post(path, json=payload) as response:
+            response.raise_for_status()
+            return await response.read()
+    
+    async def _get_json(self, path: str, params: Optional[Dict[str, str]] = None) -> Any:
+        """
+        GET a JSON document from the Node.js backend
+        
+        Raises:
+            aiohttp.ClientResponseError on an error status
+        """
+        await self._ensure_session()
+        async with self.session.get(path, params=params) as response:
+            response.raise_for_status()
+            return orjson.loads(await response.read())
     
     async def process_inbound_call(self, call_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -42,26 +176,18 @@ class InboundService:
             Routing decision and TwiML response
         """
         try:
-            if not self.session:
-                await self.initialize()
-            
             # Send call data to Node.js backend for routing
-            async with self.session.post(
-                f"{self.node_backend_url}/webhook/incoming",
-                json=call_data
-            ) as response:
-                if response.status == 200:
-                    result = await response.text()
-                    logger.info(f"Call routed via Node.js: {call_data.get('CallSid')}")
-                    return {
-                        "success": True,
-                        "twiml": result,
-                        "routing": "nodejs_backend"
-                    }
-                else:
-                    logger.error(f"Node.js routing failed: {response.status}")
-                    return await self._fallback_routing(call_data)
-                    
+            result = (await self._post_json("/webhook/incoming", call_data)).decode()
+            logger.info(f"Call routed via Node.js: {call_data.get('CallSid')}")
+            return {
+                "success": True,
+                "twiml": result,
+                "routing": "nodejs_backend"
+            }
+            
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Node.js routing failed: {e.status}")
+            return await self._fallback_routing(call_data)
         except Exception as e:
             logger.error(f"Inbound call processing error: {str(e)}")
             return await self._fallback_routing(call_data)
@@ -77,16 +203,9 @@ class InboundService:
             Basic TwiML response for AI routing
         """
         call_sid = call_data.get("CallSid")
-        from_phone = call_data.get("From")
         
-        # Generate basic TwiML for direct AI routing
-        twiml = f'''<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say voice="alice" language="en-US">Connecting you to our AI assistant.</Say>
-    <Connect>
-        <Stream url="wss://{self.node_backend_url.replace('http://', 'ws://')}/media/{call_sid}" track="both_tracks"/>
-    </Connect>
-</Response>'''
+        # Basic TwiML for direct AI routing, from the template built in __init__
+        twiml = self._fallback_twiml % call_sid
         
         logger.info(f"Fallback routing for call: {call_sid}")
         
@@ -106,24 +225,17 @@ class InboundService:
             metadata: Additional call metadata
         """
         try:
-            if not self.session:
-                await self.initialize()
-            
             status_data = {
                 "CallSid": call_sid,
                 "CallStatus": status,
                 **(metadata or {})
             }
             
-            async with self.session.post(
-                f"{self.node_backend_url}/webhook/status",
-                json=status_data
-            ) as response:
-                if response.status == 200:
-                    logger.info(f"Call status updated: {call_sid} -> {status}")
-                else:
-                    logger.error(f"Failed to update call status: {response.status}")
-                    
+            await self._post_json("/webhook/status", status_data)
+            logger.info(f"Call status updated: {call_sid} -> {status}")
+            
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Failed to update call status: {e.status}")
         except Exception as e:
             logger.error(f"Update call status error: {str(e)}")
     
@@ -132,34 +244,25 @@ class InboundService:
         Get current queue status from Node.js backend
         
         Returns:
-            Queue information and statistics
+            Queue information and statistics (mock data if the backend fails)
         """
         try:
-            if not self.session:
-                await self.initialize()
+            return await self._get_cached(("queues",), self._fetch_queue_status)
             
-            async with self.session.get(
-                f"{self.node_backend_url}/inbound/queues"
-            ) as response:
-                if response.status == 200:
-                    queue_data = await response.json()
-                    return queue_data
-                else:
-                    logger.error(f"Failed to get queue status: {response.status}")
-                    return self._get_mock_queue_data()
-                    
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Failed to get queue status: {e.status}")
+            return self._get_mock_queue_data()
         except Exception as e:
             logger.error(f"Get queue status error: {str(e)}")
             return self._get_mock_queue_data()
     
+    async def _fetch_queue_status(self) -> Dict[str, Any]:
+        """Fetch queue status from Node.js backend; raises on failure"""
+        return await self._get_json("/inbound/queues")
+    
     def _get_mock_queue_data(self) -> Dict[str, Any]:
         """Mock queue data for fallback"""
-        return {
-            "sales": {"length": 2, "avg_wait": 45},
-            "tech": {"length": 1, "avg_wait": 30},
-            "billing": {"length": 0, "avg_wait": 0},
-            "priority": {"length": 1, "avg_wait": 15}
-        }
+        return _MOCK_QUEUE_DATA
     
     async def get_analytics(self, period: str = "today") -> Dict[str, Any]:
         """
@@ -169,48 +272,114 @@ class InboundService:
             period: Time period for analytics
             
         Returns:
-            Analytics data
+            Analytics data (mock data if the backend fails)
         """
         try:
-            if not self.session:
-                await self.initialize()
+            return await self._get_cached(("analytics", period), lambda: self._fetch_analytics(period))
             
-            async with self.session.get(
-                f"{self.node_backend_url}/inbound/analytics?period={period}"
-            ) as response:
-                if response.status == 200:
-                    analytics = await response.json()
-                    return analytics
-                else:
-                    logger.error(f"Failed to get analytics: {response.status}")
-                    return self._get_mock_analytics()
-                    
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Failed to get analytics: {e.status}")
+            return self._get_mock_analytics()
         except Exception as e:
             logger.error(f"Get analytics error: {str(e)}")
             return self._get_mock_analytics()
     
+    @cached(
+        ttl=5,
+        key_builder=lambda self, period="today": period,
+        namespace="analytics"
+    )
+    async def _fetch_analytics(self, period: str = "today") -> Dict[str, Any]:
+        """Fetch analytics from Node.js backend (or the shared cache); raises on failure"""
+        return await self._get_json("/inbound/analytics", {"period": period})
+    
+    async def _get_cached(self, key: Tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Stale-while-revalidate lookup
+        
+        Fresh entries are returned directly; stale entries are returned while a
+        background refresh runs; missing or expired entries block on a fetch.
+        Only successful fetches are stored; a failed blocking fetch raises.
+        """
+        entry = self._cache.get(key)
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            now = time.monotonic()
+            if now < fresh_until:
+                return value
+            if now < stale_until:
+                self._refresh(key, fetch, background=True)
+                return value
+        
+        # Shielded so one cancelled caller does not cancel the fetch others share
+        return await asyncio.shield(self._refresh(key, fetch))
+    
+    def _refresh(
+        self,
+        key: Tuple,
+        fetch: Callable[[], Awaitable[Any]],
+        background: bool = False
+    ) -> asyncio.Task:
+        """Start, or join, the single in-flight fetch for a key"""
+        task = self._refresh_tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(key, fetch))
+            self._refresh_tasks[key] = task
+            task.add_done_callback(lambda t: self._refresh_done(key, t, background))
+        return task
+    
+    async def _fetch_and_store(self, key: Tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Fetch a value and store it as a fresh cache entry"""
+        value = await fetch()
+        fresh_until = time.monotonic() + CACHE_FRESH_SECONDS
+        self._cache[key] = (value, fresh_until, fresh_until + CACHE_STALE_SECONDS)
+        return value
+    
+    def _refresh_done(self, key: Tuple, task: asyncio.Task, background: bool):
+        """Forget a finished fetch; log background refresh failures (nobody awaits those)"""
+        self._refresh_tasks.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and background:
+            logger.warning(f"Background refresh failed {key}, serving stale data: {str(error)}")
+    
+    async def fetch_dashboard(self, period: str = "today") -> Dict[str, Any]:
+        """
+        Get queue status and analytics together
+        
+        Both requests run concurrently on pooled connections, so the
+        dashboard costs one backend round trip instead of two.
+        
+        Args:
+            period: Time period for analytics
+            
+        Returns:
+            {"queues": ..., "analytics": ...}
+        """
+        queues, analytics = await asyncio.gather(
+            self.get_queue_status(),
+            self.get_analytics(period)
+        )
+        return {"queues": queues, "analytics": analytics}
+    
+    async def stream_analytics_rows(self, period: str = "today") -> AsyncIterator[str]:
+        """
+        Yield analytics summary metrics as CSV rows
+        
+        Args:
+            period: Time period for analytics
+            
+        Yields:
+            One "metric,value" line per summary field
+        """
+        analytics = await self.get_analytics(period)
+        for metric, value in analytics.get("summary", {}).items():
+            yield f"{metric},{value}\n"
+    
     def _get_mock_analytics(self) -> Dict[str, Any]:
         """Mock analytics data for fallback"""
-        return {
-            "summary": {
-                "totalCalls": 25,
-                "inboundCalls": 15,
-                "outboundCalls": 10,
-                "completedCalls": 20,
-                "successRate": 80,
-                "avgDuration": 120
-            },
-            "ivrAnalytics": {
-                "totalIVRCalls": 12,
-                "ivrUsageRate": 80,
-                "routingBreakdown": {"sales": 5, "tech": 4, "billing": 2, "ai": 1}
-            },
-            "aiMetrics": {
-                "aiCalls": 8,
-                "aiEngagementRate": 53,
-                "avgResponseTime": 800
-            }
-        }
+        return _MOCK_ANALYTICS
     
     async def update_ivr_config(self, menu_name: str, config: Dict[str, Any]):
         """
@@ -221,20 +390,16 @@ class InboundService:
             config: IVR configuration
         """
         try:
-            if not self.session:
-                await self.initialize()
+            body = await self._post_json(
+                "/inbound/ivr/configs",
+                {"menuName": menu_name, "config": config}
+            )
+            logger.info(f"IVR config updated: {menu_name}")
+            return orjson.loads(body)
             
-            async with self.session.post(
-                f"{self.node_backend_url}/inbound/ivr/configs",
-                json={"menuName": menu_name, "config": config}
-            ) as response:
-                if response.status == 200:
-                    logger.info(f"IVR config updated: {menu_name}")
-                    return await response.json()
-                else:
-                    logger.error(f"Failed to update IVR config: {response.status}")
-                    return {"success": False}
-                    
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Failed to update IVR config: {e.status}")
+            return {"success": False}
         except Exception as e:
             logger.error(f"Update IVR config error: {str(e)}")
             return {"success": False}
@@ -247,19 +412,13 @@ class InboundService:
             menu_name: IVR menu name to test
         """
         try:
-            if not self.session:
-                await self.initialize()
+            body = await self._post_json(f"/inbound/ivr/test/{menu_name}")
+            logger.info(f"IVR test initiated: {menu_name}")
+            return orjson.loads(body)
             
-            async with self.session.post(
-                f"{self.node_backend_url}/inbound/ivr/test/{menu_name}"
-            ) as response:
-                if response.status == 200:
-                    logger.info(f"IVR test initiated: {menu_name}")
-                    return await response.json()
-                else:
-                    logger.error(f"Failed to test IVR: {response.status}")
-                    return {"success": False}
-                    
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Failed to test IVR: {e.status}")
+            return {"success": False}
         except Exception as e:
             logger.error(f"Test IVR error: {str(e)}")
             return {"success": False}
@@ -271,19 +430,25 @@ class InboundService:
         Returns:
             Health status of different components
         """
+        checked_at, cached_status = self._last_health
+        if time.monotonic() - checked_at < HEALTH_CACHE_SECONDS:
+            return cached_status
+        
         health_status = {
             "nodejs_backend": False,
             "api_connection": False
         }
         
+        # Probing must not create the session as a side effect; report unhealthy instead
+        if self.session is None:
+            logger.warning("Health check skipped - Inbound Service not initialized")
+            return health_status
+        
         try:
-            if not self.session:
-                await self.initialize()
-            
             # Test Node.js backend health
             async with self.session.get(
-                f"{self.node_backend_url}/health",
-                timeout=5
+                "/health",
+                timeout=HEALTH_TIMEOUT
             ) as response:
                 if response.status == 200:
                     health_status["nodejs_backend"] = True
@@ -293,17 +458,17 @@ class InboundService:
                     logger.warning(f"Node.js backend returned status: {response.status}")
                     health_status["api_connection"] = True
             
-        except asyncio.TimeoutError:
-            logger.error("Health check timeout - Node.js backend not responding")
-        except Exception as e:
-            error_msg = str(e).lower()
-            if "connection refused" in error_msg:
+        except aiohttp.ClientConnectorError as e:
+            if getattr(e.os_error, "errno", None) == errno.ECONNREFUSED:
                 logger.error("Node.js backend is not running - Connection refused")
-            elif "timeout" in error_msg:
-                logger.error("Health check timeout - Node.js backend not responding")
             else:
-                logger.error(f"Health check error: {str(e)}")
+                logger.error(f"Health check connect error: {str(e)}")
+        except (aiohttp.ServerTimeoutError, asyncio.TimeoutError):
+            logger.error("Health check timeout - Node.js backend not responding")
+        except Exception as e:
+            logger.error(f"Health check error: {str(e)}")
         
+        self._last_health = (time.monotonic(), health_status)
         return health_status
 
 # Global instance
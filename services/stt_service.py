@@ -2,15 +2,20 @@
 Production STT Service with Groq (Lightweight)
 Replaces heavy local Whisper with efficient Cloud API
 """
+import asyncio
 import io
+import os
+import shutil
 import time
-from groq import Groq
+from groq import AsyncGroq
 from config.settings import settings
 from utils.logger import setup_logger
 from utils.exceptions import STTException
 
 logger = setup_logger(__name__)
 
+FFMPEG_PATH = shutil.which("ffmpeg")
+
 class STTService:
     """Speech-to-Text service using Groq API (distil-whisper-large-v3-en)"""
     
@@ -19,7 +24,15 @@ class STTService:
              logger.error("GROQ_API_KEY not found. STT will fail.")
              # raise STTException("GROQ_API_KEY not configured")
         
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        # One shared async client (pooled HTTP connections), bounded concurrent sessions
+        self.client = AsyncGroq(api_key=settings.GROQ_API_KEY)
+        self._semaphore = asyncio.Semaphore(settings.STT_MAX_CONCURRENT)
+        
+        # Resample locally so uploads are 16kHz mono, which is what Whisper consumes
+        self.use_ffmpeg = settings.STT_DECODER == "ffmpeg" and FFMPEG_PATH is not None
+        if settings.STT_DECODER == "ffmpeg" and not self.use_ffmpeg:
+            logger.warning("ffmpeg not found, uploading audio without resampling")
+        
         logger.info(f"✓ STT Service initialized (Groq: {settings.WHISPER_MODEL})")
     
     async def transcribe_audio(
@@ -30,21 +43,33 @@ class STTService:
         """
         Transcribe audio bytes using Groq API
         """
+        return await self._transcribe(language, audio_data=audio_data)
+    
+    async def _transcribe(
+        self,
+        language: str = None,
+        audio_data: bytes = None,
+        file_path: str = None
+    ) -> dict:
+        """Transcribe in-memory audio or an audio file on disk"""
         start_time = time.time()
         
         try:
-            # Prepare file for Groq API
-            # Groq expects a tuple (filename, file_bytes)
-            audio_file = ("audio.wav", audio_data)
-            
-            logger.info("Transcribing audio with Groq...")
-            
-            transcription = self.client.audio.transcriptions.create(
-                file=audio_file,
-                model=settings.WHISPER_MODEL, # e.g. distil-whisper-large-v3-en
-                language=language or "en",
-                response_format="json"
-            )
+            # Admission control: caps concurrent STT sessions (ffmpeg decode + Groq
+            # request) across the REST and WebSocket paths
+            async with self._semaphore:
+                # Prepare file for Groq API
+                # Groq expects a tuple (filename, file_bytes)
+                audio_file = await self._prepare_upload(audio_data, file_path)
+                
+                logger.info("Transcribing audio with Groq...")
+                
+                transcription = await self.client.audio.transcriptions.create(
+                    file=audio_file,
+                    model=settings.WHISPER_MODEL, # e.g. distil-whisper-large-v3-en
+                    language=language or "en",
+                    response_format="json"
+                )
             
             text = transcription.text.strip()
             duration = time.time() - start_time
@@ -69,15 +94,55 @@ class STTService:
                 "error": str(e)
             }
 
-    async def transcribe_file(self, file_path: str, language: str = None) -> dict:
-        """Transcribe audio from file path"""
-        try:
+    async def _prepare_upload(self, audio_data: bytes = None, file_path: str = None) -> tuple:
+        """Build the (filename, bytes) upload, resampled by ffmpeg when enabled"""
+        if self.use_ffmpeg:
+            try:
+                return ("audio.flac", await self._ffmpeg_decode(audio_data, file_path))
+            except Exception as e:
+                logger.warning(f"ffmpeg decode failed, sending original audio: {str(e)}")
+        
+        if audio_data is None:
             with open(file_path, 'rb') as f:
                 audio_data = f.read()
-            return await self.transcribe_audio(audio_data, language)
-        except Exception as e:
-            logger.error(f"File read error: {str(e)}")
-            raise STTException(f"File read failed: {str(e)}")
+        return ("audio.wav", audio_data)
+    
+    async def _ffmpeg_decode(self, audio_data: bytes = None, file_path: str = None) -> bytes:
+        """
+        Decode and resample audio to 16kHz mono FLAC with an ffmpeg subprocess
+        
+        Given a file_path, ffmpeg reads the file itself so the original audio
+        is never loaded into Python memory; otherwise audio_data is piped in.
+        """
+        process = await asyncio.create_subprocess_exec(
+            FFMPEG_PATH, "-nostdin", "-loglevel", "error",
+            "-i", file_path or "pipe:0",
+            "-ar", str(settings.AUDIO_SAMPLE_RATE),
+            "-ac", str(settings.AUDIO_CHANNELS),
+            "-f", "flac", "pipe:1",
+            stdin=asyncio.subprocess.DEVNULL if file_path else asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            decoded, _ = await process.communicate(None if file_path else audio_data)
+        except BaseException:
+            # Cancelled (client gone) or failed mid-decode: don't leave ffmpeg running
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        
+        if process.returncode != 0 or not decoded:
+            raise STTException(f"ffmpeg exited with code {process.returncode}")
+        return decoded
+
+    async def transcribe_file(self, file_path: str, language: str = None) -> dict:
+        """Transcribe audio from file path"""
+        if not os.path.isfile(file_path):
+            logger.error(f"File read error: {file_path} not found")
+            raise STTException(f"File read failed: {file_path} not found")
+        return await self._transcribe(language, file_path=file_path)
     
     def health_check(self) -> bool:
         """Check if service is healthy"""
@@ -5,16 +5,25 @@ Fallback functionality has been disabled
 """
 import asyncio
 import edge_tts
+import hashlib
 import io
 import time
 from pathlib import Path
+from typing import Dict
+from cachetools import LRUCache
 from config.settings import settings
 from config.voice_config import ALLOWED_VOICES, DEFAULT_VOICE, DEFAULT_LANGUAGE
 from utils.logger import setup_logger
 from utils.exceptions import TTSException
+from utils.cache import cached
 
 logger = setup_logger(__name__)
 
+# Voice lists cached per requested language (client-supplied, so bounded)
+VOICES_CACHE_MAX_ENTRIES = 32
+# After a failed catalog fetch, serve the previous catalog this long before retrying
+VOICE_CATALOG_RETRY_SECONDS = 60
+
 class TTSService:
     """Text-to-Speech using Microsoft Edge TTS (FREE) - Fallback disabled"""
     
@@ -27,6 +36,14 @@ class TTSService:
         self.edge_tts_failures = 0
         self.max_failures = 3
         
+        # Synthesized audio for recent short (text, voice, rate, volume) combinations
+        self._tts_cache = LRUCache(maxsize=settings.TTS_CACHE_SIZE)
+        
+        # Edge TTS voice catalog, refetched after CACHE_TTL seconds
+        self._voices_cache = LRUCache(maxsize=VOICES_CACHE_MAX_ENTRIES)  # language -> (expires_at, voices)
+        self._voice_index: Dict[str, dict] = {}  # ShortName -> raw catalog entry
+        self._catalog_expires_at = 0.0
+        
         # Fallback disabled
         logger.info(f"✓ TTS Service initialized (Edge TTS: {self.voice})")
     
@@ -52,13 +69,28 @@ class TTSService:
         """
         start_time = time.time()
         
+        voice = voice or self.voice
+        rate = rate or self.rate
+        volume = volume or self.volume
+        
+        # Short, repeatable replies ("Sorry, could you repeat that?") are served
+        # from memory; longer LLM replies are effectively unique and never cached
+        cache_key = None
+        if len(text) <= settings.TTS_CACHE_MAX_CHARS:
+            cache_key = self._cache_key(text, voice, rate, volume)
+        cached_audio = self._tts_cache.get(cache_key) if cache_key is not None else None
+        if cached_audio is not None:
+            return {
+                "success": True,
+                "audio_data": cached_audio,
+                "format": "mp3",
+                "duration": time.time() - start_time,
+                "provider": "edge_tts_cache"
+            }
+        
         # Try Edge TTS first if enabled and under failure threshold
         if self.use_edge_tts and self.edge_tts_failures < self.max_failures:
             try:
-                voice = voice or self.voice
-                rate = rate or self.rate
-                volume = volume or self.volume
-                
                 logger.info(f"Converting text to speech (Edge TTS): {text[:50]}...")
                 
                 # Create communicate object
@@ -69,16 +101,19 @@ class TTSService:
                     volume=volume
                 )
                 
-                # Generate audio
-                audio_data = b""
+                # Generate audio (bytearray append is O(1) amortized per chunk)
+                audio_buf = bytearray()
                 async for chunk in communicate.stream():
                     if chunk["type"] == "audio":
-                        audio_data += chunk["data"]
+                        audio_buf.extend(chunk["data"])
+                audio_data = bytes(audio_buf)
                 
                 duration = time.time() - start_time
                 
                 # Reset failure count on success
                 self.edge_tts_failures = 0
+                if cache_key is not None:
+                    self._tts_cache[cache_key] = audio_data
                 
                 logger.info(f"✓ Edge TTS completed in {duration:.2f}s ({len(audio_data)} bytes)")
                 
@@ -113,6 +148,39 @@ class TTSService:
             "provider": "none"
         }
     
+    async def text_to_speech_stream(
+        self,
+        text: str,
+        voice: str = None,
+        rate: str = None,
+        volume: str = None
+    ):
+        """
+        Convert text to speech, yielding MP3 chunks as Edge TTS produces them
+        
+        Lets callers start forwarding audio at the first chunk instead of
+        waiting for the whole utterance.
+        
+        Args:
+            text: Text to convert
+            voice: Voice ID (optional, uses default)
+            rate: Speech rate adjustment (e.g., "+10%", "-20%")
+            volume: Volume adjustment (e.g., "+50%", "-10%")
+        
+        Yields:
+            Audio bytes chunks
+        """
+        communicate = edge_tts.Communicate(
+            text,
+            voice or self.voice,
+            rate=rate or self.rate,
+            volume=volume or self.volume
+        )
+        
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+    
     async def text_to_speech_file(
         self,
         text: str,
@@ -158,6 +226,11 @@ class TTSService:
                 "duration": time.time() - start_time
             }
     
+    @cached(
+        ttl=settings.CACHE_TTL,
+        key_builder=lambda self, language="en": language,
+        namespace="voices"
+    )
     async def list_voices(self, language: str = "en") -> list:
         """
         List available voices for a language
@@ -168,25 +241,56 @@ class TTSService:
         Returns:
             List of available voices
         """
-        try:
-            voices = await edge_tts.list_voices()
-            filtered = [
-                {
-                    "name": v["Name"],
-                    "gender": v["Gender"],
-                    "locale": v["Locale"],
-                    "short_name": v["ShortName"]
-                }
-                for v in voices
-                if v["Locale"].startswith(language)
-            ]
-            return filtered
-        except Exception as e:
-            logger.error(f"List voices error: {e}")
-            return []
+        now = time.monotonic()
+        entry = self._voices_cache.get(language)
+        if entry is not None and now < entry[0]:
+            return entry[1]
+        
+        if now >= self._catalog_expires_at:
+            try:
+                await self._refresh_voice_catalog()
+            except Exception as e:
+                logger.error(f"List voices error: {e}")
+                if not self._voice_index:
+                    return []
+                # Keep serving the previous catalog; retry the fetch later
+                logger.warning("Serving stale voice catalog")
+                self._catalog_expires_at = now + VOICE_CATALOG_RETRY_SECONDS
+        
+        filtered = [
+            {
+                "name": v["Name"],
+                "gender": v["Gender"],
+                "locale": v["Locale"],
+                "short_name": v["ShortName"]
+            }
+            for v in self._voice_index.values()
+            if v["Locale"].startswith(language)
+        ]
+        # Unknown languages are not cached, so junk values cannot fill the cache
+        if filtered:
+            self._voices_cache[language] = (self._catalog_expires_at, filtered)
+        return filtered
+    
+    async def _refresh_voice_catalog(self):
+        """Fetch the Edge TTS voice catalog and rebuild the ShortName index"""
+        voices = await edge_tts.list_voices()
+        self._voice_index = {v["ShortName"]: v for v in voices}
+        self._catalog_expires_at = time.monotonic() + settings.CACHE_TTL
+        self._voices_cache.clear()
+    
+    @staticmethod
+    def _cache_key(text: str, voice: str, rate: str, volume: str) -> bytes:
+        """Compact digest identifying one synthesized utterance"""
+        return hashlib.blake2b(
+            f"{voice}|{rate}|{volume}|{text}".encode(),
+            digest_size=16
+        ).digest()
     
     def set_voice(self, voice: str):
-        """Change voice"""
+        """Change voice (validated against the voice catalog once it has been loaded)"""
+        if self._voice_index and voice not in self._voice_index:
+            raise TTSException(f"Unknown voice: {voice}")
         self.voice = voice
         logger.info(f"Voice changed to: {voice}")
     
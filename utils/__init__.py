@@ -1,9 +1,13 @@
 """Utilities module"""
 from .logger import setup_logger
 from .exceptions import *
+from .clock import UTC, current_iso_ts, run_clock
 
 __all__ = [
     'setup_logger',
+    'UTC',
+    'current_iso_ts',
+    'run_clock',
     'AIServiceException',
     'STTException',
     'AIException',
@@ -0,0 +1,88 @@
+"""
+Optional response cache
+Backed by Redis (REDIS_URL) or process memory via aiocache when ENABLE_CACHE is set;
+every helper is a no-op otherwise
+"""
+import functools
+from typing import Callable, Optional
+from config.settings import settings
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _build_cache():
+    """Create the shared cache backend, or None when caching is disabled"""
+    if not settings.ENABLE_CACHE:
+        return None
+    
+    from aiocache import Cache
+    from aiocache.serializers import JsonSerializer
+    
+    if settings.REDIS_URL:
+        backend = Cache.from_url(settings.REDIS_URL)
+    else:
+        backend = Cache(Cache.MEMORY)
+    # Cached values are plain JSON; never unpickle data read back from a shared Redis
+    backend.serializer = JsonSerializer()
+    
+    logger.info(f"✓ Response cache enabled ({'redis' if settings.REDIS_URL else 'memory'})")
+    return backend
+
+
+cache = _build_cache()
+
+
+def cached(ttl: int, key_builder: Callable[..., str], namespace: Optional[str] = None):
+    """
+    Cache an async function's non-empty result
+    
+    Exceptions propagate and are not cached, so decorate the fetch that raises
+    on failure, not a wrapper that substitutes fallback data (which would be
+    shared with every instance). Values must be JSON-serializable.
+    
+    Args:
+        ttl: Seconds to keep the value
+        key_builder: Called with the function's arguments, returns the cache key
+        namespace: Key prefix, used to invalidate a whole group
+    """
+    def decorator(func):
+        if cache is None:
+            return func
+        
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = key_builder(*args, **kwargs)
+            try:
+                value = await cache.get(key, namespace=namespace)
+                if value is not None:
+                    return value
+            except Exception as e:
+                logger.warning(f"Cache get error [{key}]: {str(e)}")
+            
+            value = await func(*args, **kwargs)
+            
+            if value:
+                try:
+                    await cache.set(key, value, ttl=ttl, namespace=namespace)
+                except Exception as e:
+                    logger.warning(f"Cache set error [{key}]: {str(e)}")
+            return value
+        return wrapper
+    return decorator
+
+
+async def invalidate(namespace: str):
+    """Drop every cached entry in a namespace"""
+    if cache is None:
+        return
+    try:
+        await cache.clear(namespace=namespace)
+    except Exception as e:
+        logger.warning(f"Cache invalidate error [{namespace}]: {str(e)}")
+
+
+async def close():
+    """Release the cache backend connection"""
+    if cache is not None:
+        await cache.close()
@@ -0,0 +1,30 @@
+"""
+Cached wall-clock timestamps for hot paths
+A background task refreshes the ISO string every 100ms
+"""
+import asyncio
+from datetime import datetime, timezone
+
+# Shared tzinfo singleton
+UTC = timezone.utc
+
+# Refresh granularity in seconds
+TICK_INTERVAL = 0.1
+
+_current_iso_ts = datetime.now(UTC).isoformat()
+
+
+def current_iso_ts() -> str:
+    """Current UTC time as ISO string (up to TICK_INTERVAL old)"""
+    return _current_iso_ts
+
+
+async def run_clock():
+    """Refresh the cached timestamp until cancelled"""
+    global _current_iso_ts
+    try:
+        while True:
+            _current_iso_ts = datetime.now(UTC).isoformat()
+            await asyncio.sleep(TICK_INTERVAL)
+    except asyncio.CancelledError:
+        pass